@@ -1,5 +1,7 @@
 import numpy as np
 
+import xmask as xm
+
 _config_ion_yaml_str = """
 config_mad:
     # Links to be made for tools and scripts
@@ -260,6 +262,9 @@ config_lumi_leveling:
 
 """
 
+# Parsed once and shared by the ion tests (xmask.yaml loads 1e-3 as float)
+_CONFIG = xm.yaml.load(_config_ion_yaml_str)
+
 import warnings
 
 def build_sequence(mad, mylhcbeam, **kwargs):
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+import pytest
+
+test_data_dir = Path(__file__).parent.parent / "test_data"
+
+@pytest.fixture(scope="session")
+def ion_collider_00():
+
+    from cpymad.madx import Madx
+
+    import xmask as xm
+    import xmask.lhc as xmlhc
+
+    from _complementary_run3_ions import (
+        _CONFIG, build_sequence, apply_optics)
+
+    # Read config file
+    config = _CONFIG
+    config_mad_model = config['config_mad']
+
+    # Make mad environment
+    xm.make_mad_environment(links={
+        "optics_runII": test_data_dir / 'lhc_ion/runII',
+        "optics_runIII": test_data_dir / 'lhc_ion/runIII',
+        }
+    )
+
+    # Start mad
+    mad_b1b2 = Madx(command_log="mad_collider.log")
+    mad_b4 = Madx(command_log="mad_b4.log")
+
+    # Build sequences
+    build_sequence(mad_b1b2, mylhcbeam=1)
+    build_sequence(mad_b4, mylhcbeam=4)
+
+    # Apply optics (only for b1b2, b4 will be generated from b1b2)
+    apply_optics(mad_b1b2, optics_file=config_mad_model['optics_file'])
+
+    # Build xsuite collider
+    collider = xmlhc.build_xsuite_collider(
+        sequence_b1=mad_b1b2.sequence.lhcb1,
+        sequence_b2=mad_b1b2.sequence.lhcb2,
+        sequence_b4=mad_b4.sequence.lhcb2,
+        beam_config=config_mad_model['beam_config'],
+        enable_imperfections=config_mad_model['enable_imperfections'],
+        enable_knob_synthesis=config_mad_model['enable_knob_synthesis'],
+        pars_for_imperfections=config_mad_model['pars_for_imperfections'],
+        ver_lhc_run=config_mad_model['ver_lhc_run'],
+        ver_hllhc_optics=config_mad_model['ver_hllhc_optics'])
+
+    # Save to file only when debugging (the collider is shared in memory)
+    if os.environ.get('XMASK_DUMP_COLLIDER'):
+        collider.to_json('collider_lhc_ion_00.json')
+
+    return collider
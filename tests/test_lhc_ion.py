@@ -1,58 +1,26 @@
 from itertools import product
-from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
-from cpymad.madx import Madx
 import xtrack as xt
 import xfields as xf
 
 import xmask as xm
 import xmask.lhc as xmlhc
-import yaml
 
 from _complementary_run3_ions import (
-    _config_ion_yaml_str, build_sequence, apply_optics, orbit_correction_config,
+    _CONFIG, orbit_correction_config,
     check_optics_orbit_etc, _get_z_centroids, filling_scheme)
 
-test_data_dir = Path(__file__).parent.parent / "test_data"
+# We assume that the tests will be run in order and in a single process, so
+# they must not be distributed with pytest-xdist. The initial collider comes
+# from the session fixture ion_collider_00 (conftest.py), then the tests hand
+# it over through collider_lhc_ion_0{1,2,3,4}.json.
 
-def test_lhc_ion_0_create_collider():
-    # Read config file
-    config = yaml.safe_load(_config_ion_yaml_str)
-    config_mad_model = config['config_mad']
-
-    # Make mad environment
-    xm.make_mad_environment(links={
-        "optics_runII": test_data_dir / 'lhc_ion/runII',
-        "optics_runIII": test_data_dir / 'lhc_ion/runIII',
-        }
-    )
-
-    # Start mad
-    mad_b1b2 = Madx(command_log="mad_collider.log")
-    mad_b4 = Madx(command_log="mad_b4.log")
-
-    # Build sequences
-    build_sequence(mad_b1b2, mylhcbeam=1)
-    build_sequence(mad_b4, mylhcbeam=4)
-
-    # Apply optics (only for b1b2, b4 will be generated from b1b2)
-    apply_optics(mad_b1b2, optics_file=config_mad_model['optics_file'])
-
-    # Build xsuite collider
-    collider = xmlhc.build_xsuite_collider(
-        sequence_b1=mad_b1b2.sequence.lhcb1,
-        sequence_b2=mad_b1b2.sequence.lhcb2,
-        sequence_b4=mad_b4.sequence.lhcb2,
-        beam_config=config_mad_model['beam_config'],
-        enable_imperfections=config_mad_model['enable_imperfections'],
-        enable_knob_synthesis=config_mad_model['enable_knob_synthesis'],
-        pars_for_imperfections=config_mad_model['pars_for_imperfections'],
-        ver_lhc_run=config_mad_model['ver_lhc_run'],
-        ver_hllhc_optics=config_mad_model['ver_hllhc_optics'])
+def test_lhc_ion_0_create_collider(ion_collider_00):
 
+    collider = ion_collider_00
 
     assert len(collider.lines.keys()) == 4
 
@@ -65,14 +33,11 @@ def test_lhc_ion_0_create_collider():
         assert np.isclose(pref.mass0, 193687272900.0, rtol=1e-10, atol=0)
         assert np.isclose(pref.gamma0[0], 2963.54, rtol=1e-6, atol=0)
 
-    # Save to file
-    collider.to_json('collider_lhc_ion_00.json')
-
-
-def test_lhc_ion_1_install_beambeam():
 
+def test_lhc_ion_1_install_beambeam(ion_collider_00):
 
-    collider = xt.Multiline.from_json('collider_lhc_ion_00.json')
+    # Work on a copy, the session collider is shared with other tests
+    collider = xt.Multiline.from_dict(ion_collider_00.to_dict())
 
     collider.install_beambeam_interactions(
         clockwise_line='lhcb1',
@@ -114,7 +79,9 @@ def test_lhc_ion_1_install_beambeam():
     tw1_b1 = collider['lhcb1'].twiss(method='4d')
     tw1_b2 = collider['lhcb2'].twiss(method='4d')
 
-    collider_ref = xt.Multiline.from_json('collider_lhc_ion_00.json')
+    # Separate serialization, the reference must not share anything with the
+    # collider above and from_dict is not guaranteed to leave its input intact
+    collider_ref = xt.Multiline.from_dict(ion_collider_00.to_dict())
 
     collider_ref.build_trackers()
 
@@ -134,19 +101,16 @@ def test_lhc_ion_1_install_beambeam():
     assert np.isclose(tw1_b2.dqx, tw0_b2.dqx, atol=1e-3, rtol=0)
     assert np.isclose(tw1_b2.dqy, tw0_b2.dqy, atol=1e-3, rtol=0)
 
-    for ipn in [1, 2, 3, 4, 5, 6, 7, 8]:
-        assert np.isclose(tw1_b1['betx', f'ip{ipn}'], tw0_b1['betx', f'ip{ipn}'], rtol=1e-5, atol=0)
-        assert np.isclose(tw1_b1['bety', f'ip{ipn}'], tw0_b1['bety', f'ip{ipn}'], rtol=1e-5, atol=0)
-        assert np.isclose(tw1_b2['betx', f'ip{ipn}'], tw0_b2['betx', f'ip{ipn}'], rtol=1e-5, atol=0)
-        assert np.isclose(tw1_b2['bety', f'ip{ipn}'], tw0_b2['bety', f'ip{ipn}'], rtol=1e-5, atol=0)
-
-        assert np.isclose(tw1_b1['px', f'ip{ipn}'], tw0_b1['px', f'ip{ipn}'], rtol=1e-6, atol=0)
-        assert np.isclose(tw1_b1['py', f'ip{ipn}'], tw0_b1['py', f'ip{ipn}'], rtol=1e-6, atol=0)
-        assert np.isclose(tw1_b2['px', f'ip{ipn}'], tw0_b2['px', f'ip{ipn}'], rtol=1e-6, atol=0)
-        assert np.isclose(tw1_b2['py', f'ip{ipn}'], tw0_b2['py', f'ip{ipn}'], rtol=1e-6, atol=0)
-
-        assert np.isclose(tw1_b1['s', f'ip{ipn}'], tw0_b1['s', f'ip{ipn}'], rtol=1e-10, atol=0)
-        assert np.isclose(tw1_b2['s', f'ip{ipn}'], tw0_b2['s', f'ip{ipn}'], rtol=1e-10, atol=0)
+    ips = [f'ip{ipn}' for ipn in [1, 2, 3, 4, 5, 6, 7, 8]]
+    rtol_at_ips = {'betx': 1e-5, 'bety': 1e-5, 'px': 1e-6, 'py': 1e-6, 's': 1e-10}
+    tws = {'lhcb1': (tw1_b1, tw0_b1), 'lhcb2': (tw1_b2, tw0_b2)}
+    for line_name, (tw1, tw0) in tws.items():
+        for qq, rtol in rtol_at_ips.items():
+            np.testing.assert_allclose(
+                np.array([tw1[qq, ip] for ip in ips]),
+                np.array([tw0[qq, ip] for ip in ips]),
+                rtol=rtol, atol=0, equal_nan=False,
+                err_msg=f'{line_name} {qq} at {ips}')
 
 
 def test_lhc_ion_2_tuning():
@@ -154,7 +118,7 @@ def test_lhc_ion_2_tuning():
     collider = xt.Multiline.from_json('collider_lhc_ion_01.json')
 
     # Read config file
-    config = yaml.safe_load(_config_ion_yaml_str)
+    config = _CONFIG
     conf_knobs_and_tuning = config['config_knobs_and_tuning']
 
     knob_settings = conf_knobs_and_tuning['knob_settings']
@@ -228,7 +192,7 @@ def test_lhc_ion_3_leveling():
     collider = xt.Multiline.from_json('collider_lhc_ion_02.json')
     collider.build_trackers()
 
-    config = yaml.safe_load(_config_ion_yaml_str)
+    config = _CONFIG
     conf_knobs_and_tuning = config['config_knobs_and_tuning']
     config_lumi_leveling = config['config_lumi_leveling']
     config_beambeam = config['config_beambeam']